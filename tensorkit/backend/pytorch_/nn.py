@@ -97,12 +97,13 @@ def l1_regularization(inputs: List[Tensor]) -> Tensor:
 def l2_regularization(inputs: List[Tensor]) -> Tensor:
     if len(inputs) == 0:
         return float_scalar(0.)
+    elif len(inputs) == 1:
+        return torch.sqrt(torch.sum(inputs[0] ** 2))
     else:
-        ret = torch.sum(inputs[0] ** 2)
-        for t in inputs[1:]:
-            ret = ret + torch.sum(t ** 2)
-        ret = torch.sqrt(ret)
-        return ret
+        # `_foreach_norm` batches the per-tensor reductions in C++,
+        # instead of launching one kernel per parameter tensor
+        norms = torch.stack(list(torch._foreach_norm(inputs, 2.)))
+        return torch.sqrt(torch.sum(norms ** 2))
 
 
 # ---- cross entropy functions ----
@@ -206,8 +206,12 @@ class Adam(BackendOptimizer):
                  beta_1: float = 0.9,
                  beta_2: float = 0.999,
                  epsilon: float = 1e-8,
-                 amsgrad: bool = False):
+                 amsgrad: bool = False,
+                 fused: Optional[bool] = None):
         params = list(params)
+        # only forward `fused` when requested, such that older PyTorch
+        # versions without this argument still work
+        extra_args = {} if fused is None else {'fused': fused}
         super().__init__(
             params=params,
             lr=lr,
@@ -217,6 +221,7 @@ class Adam(BackendOptimizer):
                 betas=(beta_1, beta_2),
                 eps=epsilon,
                 amsgrad=amsgrad,
+                **extra_args,
             )
         )
 
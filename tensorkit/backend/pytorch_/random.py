@@ -282,9 +282,10 @@ def bernoulli_log_prob(given: Tensor,
         return binary_cross_entropy_with_logits(
             logits=logits, labels=given, negative=True, reduction='sum')
     elif group_ndims > 0:
-        ret = binary_cross_entropy_with_logits(
-            logits=logits, labels=given, negative=True)
-        return torch.sum(ret, dim=int_range(-group_ndims, 0))
+        # negate after the reduction, such that the negation is applied
+        # to the smaller, reduced tensor
+        ret = binary_cross_entropy_with_logits(logits=logits, labels=given)
+        return -torch.sum(ret, dim=int_range(-group_ndims, 0))
     else:
         return binary_cross_entropy_with_logits(
             logits=logits, labels=given, negative=True)
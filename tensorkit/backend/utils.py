@@ -1,9 +1,16 @@
+import sys
+
 from ..settings_ import settings
 
 if settings.backend == 'PyTorch':
     from .pytorch_ import utils
     from .pytorch_.utils import *
 else:
-    RuntimeError(f'Backend {settings.backend} not supported.')
+    raise RuntimeError(f'Backend {settings.backend} not supported.')
 
 __all__ = utils.__all__
+
+# alias this module to the concrete backend module, such that attribute
+# access on `tensorkit.backend.utils` hits the backend module directly,
+# without going through an extra indirection
+sys.modules[__name__] = utils
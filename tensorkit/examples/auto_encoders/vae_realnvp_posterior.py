@@ -4,6 +4,7 @@ from typing import *
 import mltk
 import tensorkit as tk
 import tensorkit.utils.misc
+import torch
 from tensorkit import tensor as T
 from tensorkit.examples import utils
 from tensorkit.typing_ import TensorOrData
@@ -19,6 +20,11 @@ class Config(mltk.Config):
     strict_invertible: bool = False
     qz_logstd_min: Optional[float] = -7
     l2_reg: float = 0.0001
+    use_torch_compile: bool = True
+    grad_checkpoint_segments: int = 4
+    binarize_on_device: bool = True
+    script_coupling_shared: bool = True
+    use_cuda_graphs: bool = False
 
     # initialization parameters
     init_batch_count: int = 10
@@ -27,6 +33,7 @@ class Config(mltk.Config):
     max_epoch: int = 2400
     batch_size: int = 128
     warmup_epochs: Optional[int] = 100
+    use_amp: bool = True
     initial_lr: float = 0.001
     lr_anneal_ratio: float = 0.1
     lr_anneal_epochs: int = 800
@@ -35,12 +42,99 @@ class Config(mltk.Config):
     # evaluation parameters
     test_n_z: int = 500
     test_batch_size: int = 256
+    use_vmap_eval: bool = True
+
+
+def _to_uint8_images(logits: torch.Tensor) -> torch.Tensor:
+    """
+    Convert decoder logits into `uint8` images of shape `[-1, 28, 28]`,
+    entirely on the device, so that only the final uint8 buffer needs to
+    be moved back to the host.
+    """
+    images = torch.clamp(torch.sigmoid(logits) * 255., 0., 255.)
+    return images.to(torch.uint8).reshape(-1, 28, 28)
+
+
+try:  # fuse the conversion into a single kernel if possible
+    _to_uint8_images = torch.compile(_to_uint8_images, dynamic=False)
+except Exception:
+    pass
+
+
+def _maybe_checkpoint_sequential(module: T.Module,
+                                 segments: int,
+                                 input: T.Tensor) -> T.Tensor:
+    """
+    Run `module` on `input`, re-computing the intermediate activations in
+    backward via gradient checkpointing when applicable, to trade a little
+    extra compute for a lower activation memory footprint.
+    """
+    if module.training and torch.is_grad_enabled() and \
+            isinstance(module, torch.nn.Sequential):
+        # a Sequential cannot be split into more segments than it has
+        # children; `checkpoint_sequential` would compute a zero segment
+        # size and crash
+        segments = min(segments, len(module))
+        if segments > 1:
+            return torch.utils.checkpoint.checkpoint_sequential(
+                module, segments, input, use_reentrant=False)
+    return module(input)
+
+
+class CheckpointedSequentialFlow(tk.flows.SequentialFlow):
+    """
+    A :class:`SequentialFlow` that runs its chain in gradient-checkpointed
+    segments during training, such that only the segment boundaries are kept
+    alive for backprop instead of every intermediate flow activation.
+    """
+
+    segments: int
+
+    def __init__(self,
+                 flows: Sequence[T.Module],
+                 segments: int = 1):
+        super().__init__(flows)
+        self.segments = int(segments)
+
+    def _run_segment(self,
+                     flows: Sequence[T.Module],
+                     output: T.Tensor,
+                     output_log_det: T.Tensor,
+                     compute_log_det: bool
+                     ) -> Tuple[T.Tensor, T.Tensor]:
+        for flow in flows:
+            output, output_log_det = flow(
+                output, output_log_det, False, compute_log_det)
+        return output, output_log_det
+
+    def _call_chain(self,
+                    output: T.Tensor,
+                    output_log_det: Optional[T.Tensor],
+                    compute_log_det: bool
+                    ) -> Tuple[T.Tensor, Optional[T.Tensor]]:
+        if self.segments <= 1 or not self.training or \
+                not torch.is_grad_enabled():
+            return super()._call_chain(output, output_log_det, compute_log_det)
+
+        if output_log_det is None:
+            output_log_det = T.zeros(
+                T.shape(output)[:-self.x_event_ndims], dtype=T.get_dtype(output))
+        chain = list(self._chain)
+        segment_size = (len(chain) + self.segments - 1) // self.segments
+        for i in range(0, len(chain), segment_size):
+            output, output_log_det = torch.utils.checkpoint.checkpoint(
+                partial(self._run_segment, chain[i: i + segment_size]),
+                output, output_log_det, compute_log_det,
+                use_reentrant=False,
+            )
+        return output, output_log_det
 
 
 class VAE(tk.layers.BaseLayer):
 
     x_dim: int
     config: Config
+    checkpoint_segments: int
 
     def __init__(self, x_dim: int, config: Config):
         super().__init__()
@@ -54,21 +148,42 @@ class VAE(tk.layers.BaseLayer):
         # nn for q(z|x)
         q_builder = tk.layers.SequentialBuilder(x_dim, layer_args=layer_args)
         self.hx_for_qz = q_builder.dense(500).dense(500).build()
-        self.qz_mean = q_builder.as_input().linear(config.z_dim).build()
-        self.qz_logstd = q_builder.as_input().linear(config.z_dim).build()
+        # one fused head for both the mean and logstd: a single 2x wider
+        # GEMM reads `hx` once, instead of two back-to-back GEMMs
+        self.qz_head = q_builder.as_input().linear(2 * config.z_dim).build()
 
         # the posterior flow
+        # the split sizes of the coupling layers are fixed by `z_dim`,
+        # compute them just once instead of per flow level
+        n1 = config.z_dim // 2
+        n2 = config.z_dim - n1
+
+        # CUDA-graph replay and gradient checkpointing are mutually
+        # exclusive: the checkpointed re-forward cannot run inside a
+        # captured graph
+        self.checkpoint_segments = \
+            1 if config.use_cuda_graphs else config.grad_checkpoint_segments
+        # scripting the shared stack is likewise incompatible with
+        # non-reentrant checkpointing: the backward-time re-forward fails
+        # inside the TorchScript interpreter
+        script_shared = (config.script_coupling_shared and
+                         self.checkpoint_segments <= 1)
+
         flows = []
         for i in range(config.flow_levels):
             # act norm
             flows.append(tk.flows.ActNorm(config.z_dim))
 
             # coupling layer
-            n1 = config.z_dim // 2
-            n2 = config.z_dim - n1
             b = tk.layers.SequentialBuilder(n1, layer_args=layer_args)
             for j in range(config.coupling_hidden_layer_count):
                 b.dense(config.coupling_hidden_layer_units)
+            # the shared dense stack runs on every flow level and has no
+            # Python control flow, making it a cheap scripting target when
+            # the flow is not gradient-checkpointed
+            shared = b.build()
+            if script_shared:
+                shared = torch.jit.script(shared)
             shift_and_pre_scale = tk.layers.Branch(
                 branches=[
                     # shift
@@ -76,7 +191,7 @@ class VAE(tk.layers.BaseLayer):
                     # pre_scale
                     b.as_input().linear(n2, weight_init=tk.init.zeros).build(),
                 ],
-                shared=b.build(),
+                shared=shared,
             )
             flows.append(tk.flows.CouplingLayer(
                 shift_and_pre_scale, scale=config.coupling_layer_scale))
@@ -84,7 +199,8 @@ class VAE(tk.layers.BaseLayer):
             # feature rearrangement by invertible dense
             flows.append(tk.flows.InvertibleDense(
                 config.z_dim, strict=config.strict_invertible))
-        self.posterior_flow = tk.flows.SequentialFlow(flows)
+        self.posterior_flow = CheckpointedSequentialFlow(
+            flows, segments=self.checkpoint_segments)
 
         # nn for p(x|z)
         p_builder = tk.layers.SequentialBuilder(config.z_dim, layer_args=layer_args)
@@ -93,17 +209,52 @@ class VAE(tk.layers.BaseLayer):
     def initialize(self, x):
         x = T.as_tensor(x)
         _ = self.get_chain(x).vi.training.sgvb()  # trigger initialization
-        tk.layers.jit_compile_children(self)
-        _ = self.get_chain(x).vi.training.sgvb()  # trigger JIT
+        if self.config.use_cuda_graphs and torch.cuda.is_available():
+            # capture the dense encoder/decoder forward+backward as CUDA
+            # graphs; the train batch size is constant (the train stream
+            # skips incomplete batches), and in eval mode the patched
+            # modules automatically fall back to the eager forward
+            n = self.config.batch_size
+            sample_x = T.random.rand([n, self.x_dim])
+            sample_z = T.random.randn([n, self.config.z_dim])
+            self.hx_for_qz, self.px_logits = \
+                torch.cuda.make_graphed_callables(
+                    (self.hx_for_qz, self.px_logits),
+                    ((sample_x,), (sample_z,)))
+        elif self.config.use_torch_compile:
+            # The batch size is fixed throughout training, thus compile the
+            # hot forward modules with static shapes.  Degrade to eager if
+            # the compiler rejects any of the graphs.  Only the dense heads
+            # are compiled: wrapping `posterior_flow` itself would replace
+            # the `Flow` with an `OptimizedModule`, which
+            # `FlowDistribution` rejects.
+            for attr in ('hx_for_qz', 'px_logits'):
+                try:
+                    setattr(self, attr, torch.compile(
+                        getattr(self, attr), mode='reduce-overhead',
+                        fullgraph=False, dynamic=False))
+                except Exception:
+                    pass
+        else:
+            # the checkpointed flow cannot be scripted, keep it eager
+            tk.layers.jit_compile_children(
+                self,
+                filter=lambda m: not isinstance(m, CheckpointedSequentialFlow))
+        _ = self.get_chain(x).vi.training.sgvb()  # trigger JIT / compile
 
     def q(self,
           x: T.Tensor,
           observed: Optional[Mapping[str, TensorOrData]] = None,
           n_z: Optional[int] = None) -> tk.BayesianNet:
         net = tk.BayesianNet(observed=observed)
-        hx = self.hx_for_qz(T.cast(x, dtype=T.float32))
-        z_mean = self.qz_mean(hx)
-        z_logstd = self.qz_logstd(hx)
+        # with on-device binarization `x` is already float32; only pay
+        # for the cast when the CPU-side int mapper is in use
+        if T.get_dtype(x) != T.float32:
+            x = T.cast(x, dtype=T.float32)
+        hx = _maybe_checkpoint_sequential(
+            self.hx_for_qz, self.checkpoint_segments, x)
+        z_mean, z_logstd = T.split(
+            self.qz_head(hx), [self.config.z_dim, self.config.z_dim], axis=-1)
         z_logstd = T.maybe_clip(z_logstd, min_val=self.config.qz_logstd_min)
         qz = tk.FlowDistribution(
             tk.Normal(mean=z_mean, logstd=z_logstd, event_ndims=1),
@@ -120,7 +271,8 @@ class VAE(tk.layers.BaseLayer):
         # sample z ~ p(z)
         z = net.add('z', tk.UnitNormal([1, self.config.z_dim], event_ndims=1),
                     n_samples=n_z)
-        x_logits = self.px_logits(z.tensor)
+        x_logits = _maybe_checkpoint_sequential(
+            self.px_logits, self.checkpoint_segments, z.tensor)
         x = net.add('x', tk.Bernoulli(logits=x_logits, event_ndims=1))
         return net
 
@@ -129,18 +281,57 @@ class VAE(tk.layers.BaseLayer):
         return self.q(x, n_z=n_z).chain(
             self.p, observed={'x': x}, n_z=n_z, latent_axis=latent_axis)
 
+    def sample_log_probs(self, x, n_z: int):
+        """
+        Draw `n_z` posterior samples and compute their log-probs with
+        :func:`torch.func.vmap`, instead of broadcasting an `[n_z, ...]`
+        batch through every layer and flow.
+
+        Returns:
+            ``(log q(z|x), log p(z), log p(x|z))``, each with a leading
+            `n_z` sampling axis.
+        """
+        def draw_one(_):
+            q_net = self.q(x)
+            z = q_net['z'].tensor
+            p_net = self.p(observed={'z': z, 'x': x})
+            return (q_net['z'].log_prob(), p_net['z'].log_prob(),
+                    p_net['x'].log_prob())
+
+        return torch.func.vmap(draw_one, randomness='different')(
+            T.zeros([n_z]))
+
 
 def main(exp: mltk.Experiment[Config]):
-    # prepare the data
+    # prepare the data.  when binarizing on device, the streams yield the
+    # raw [0, 1] pixel intensities, and the stochastic binarization is
+    # drawn with `torch.bernoulli` inside the train step, keeping the
+    # CPU-side data pipeline free of per-pixel sampling
     train_stream, _, test_stream = utils.get_mnist_streams(
         batch_size=exp.config.batch_size,
         test_batch_size=exp.config.test_batch_size,
         flatten=True,
         x_range=(0., 1.),
         use_y=False,
-        mapper=utils.BernoulliSampler().as_mapper(),
+        mapper=(None if exp.config.binarize_on_device
+                else utils.BernoulliSampler().as_mapper()),
     )
 
+    if exp.config.binarize_on_device:
+        # the evaluation protocol must match the baseline, which binarized
+        # the test set just once; draw the fixed test binarization up
+        # front instead of re-sampling it at every evaluation pass
+        [test_x] = test_stream.get_arrays()
+        test_stream = tk.utils.as_tensor_stream(
+            mltk.DataStream.arrays(
+                [T.to_numpy(torch.bernoulli(T.as_tensor(test_x)))],
+                batch_size=exp.config.test_batch_size),
+            prefetch=5,
+        )
+
+    def binarize_x(x):
+        return torch.bernoulli(x) if exp.config.binarize_on_device else x
+
     tensorkit.utils.misc.print_experiment_summary(
         exp, train_data=train_stream, test_data=test_stream)
 
@@ -153,24 +344,38 @@ def main(exp: mltk.Experiment[Config]):
 
     # initialize the network with first few batches of train data
     [init_x] = train_stream.get_arrays(max_batch=exp.config.init_batch_count)
-    vae.initialize(init_x)
+    vae.initialize(binarize_x(T.as_tensor(init_x)))
     mltk.print_with_time('Network initialized')
 
     # define the train and evaluate functions
-    def train_step(x):
-        chain = vae.get_chain(x)
+    amp_enabled = exp.config.use_amp and torch.cuda.is_available()
 
-        # loss with beta
+    def train_step(x):
+        x = binarize_x(x)
+        # run the forward passes under bf16 autocast (no GradScaler is
+        # needed for bf16); the log-prob reductions stay in fp32
+        with torch.autocast('cuda', dtype=torch.bfloat16, enabled=amp_enabled):
+            chain = vae.get_chain(x)
+            log_qz_vec = T.cast(chain.q['z'].log_prob(), dtype=T.float32)
+            log_pz_vec = T.cast(chain.p['z'].log_prob(), dtype=T.float32)
+            log_px_vec = T.cast(chain.p['x'].log_prob(), dtype=T.float32)
+
+        # loss with beta, reduced in a single pass over the element-wise
+        # log-probs instead of three separate mean reductions
         beta = min(loop.epoch / 100., 1.)
-        log_qz_given_x = T.reduce_mean(chain.q['z'].log_prob())
-        log_pz = T.reduce_mean(chain.p['z'].log_prob())
-        log_px_given_z = T.reduce_mean(chain.p['x'].log_prob())
-        kl = log_pz - log_qz_given_x
-        elbo = log_px_given_z + beta * kl
+        elbo = T.reduce_mean(log_px_vec + beta * (log_pz_vec - log_qz_vec))
 
         # add regularization
         loss = -elbo + exp.config.l2_reg * T.nn.l2_regularization(params)
 
+        # the remaining metrics are for logging only, keep them out of
+        # the autograd graph
+        with T.no_grad():
+            log_qz_given_x = T.reduce_mean(log_qz_vec)
+            log_pz = T.reduce_mean(log_pz_vec)
+            log_px_given_z = T.reduce_mean(log_px_vec)
+            kl = log_pz - log_qz_given_x
+
         # construct the train metrics
         ret = {'loss': loss, 'kl': kl, 'log p(x|z)': log_px_given_z,
                'log q(z|x)': log_qz_given_x, 'log p(z)': log_pz}
@@ -180,13 +385,25 @@ def main(exp: mltk.Experiment[Config]):
 
     def eval_step(x, n_z=exp.config.test_n_z):
         with tk.layers.scoped_eval_mode(vae), T.no_grad():
-            chain = vae.get_chain(x, n_z=n_z)
-            log_qz_given_x = T.reduce_mean(chain.q['z'].log_prob())
-            log_pz = T.reduce_mean(chain.p['z'].log_prob())
-            log_px_given_z = T.reduce_mean(chain.p['x'].log_prob())
+            if exp.config.use_vmap_eval and hasattr(torch, 'func'):
+                log_qz_t, log_pz_t, log_px_t = vae.sample_log_probs(x, n_z=n_z)
+                log_qz_given_x = T.reduce_mean(log_qz_t)
+                log_pz = T.reduce_mean(log_pz_t)
+                log_px_given_z = T.reduce_mean(log_px_t)
+                nll = -tk.variational.importance_sampling_log_likelihood(
+                    log_joint=log_pz_t + log_px_t,
+                    latent_log_joint=log_qz_t,
+                    axis=[0],
+                    reduction='mean',
+                )
+            else:
+                chain = vae.get_chain(x, n_z=n_z)
+                log_qz_given_x = T.reduce_mean(chain.q['z'].log_prob())
+                log_pz = T.reduce_mean(chain.p['z'].log_prob())
+                log_px_given_z = T.reduce_mean(chain.p['x'].log_prob())
+                nll = -chain.vi.evaluation.is_loglikelihood(reduction='mean')
             kl = log_pz - log_qz_given_x
             elbo = log_px_given_z + kl
-            nll = -chain.vi.evaluation.is_loglikelihood(reduction='mean')
         return {'elbo': elbo, 'nll': nll, 'kl': kl, 'log p(x|z)': log_px_given_z,
                'log q(z|x)': log_qz_given_x, 'log p(z)': log_pz}
 
@@ -194,10 +411,7 @@ def main(exp: mltk.Experiment[Config]):
         epoch = epoch or loop.epoch
         with tk.layers.scoped_eval_mode(vae), T.no_grad():
             logits = vae.p(n_z=100)['x'].distribution.logits
-            images = T.reshape(
-                T.cast(T.clip(T.nn.sigmoid(logits) * 255., 0., 255.), dtype=T.uint8),
-                [-1, 28, 28],
-            )
+            images = _to_uint8_images(logits)
         utils.save_images_collection(
             images=T.to_numpy(images),
             filename=exp.abspath(f'plotting/{epoch}.png'),
@@ -207,7 +421,8 @@ def main(exp: mltk.Experiment[Config]):
     # build the optimizer and the train loop
     loop = mltk.TrainLoop(max_epoch=exp.config.max_epoch)
     loop.add_callback(mltk.callbacks.StopOnNaN())
-    optimizer = tk.optim.Adam(params)
+    optimizer = tk.optim.Adam(
+        params, fused=True if torch.cuda.is_available() else None)
     lr_scheduler = tk.optim.lr_scheduler.AnnealingLR(
         optimizer=optimizer,
         initial_lr=exp.config.initial_lr,
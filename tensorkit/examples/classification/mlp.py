@@ -1,6 +1,7 @@
 import mltk
 import tensorkit as tk
 import tensorkit.utils.misc
+import torch
 from tensorkit import tensor as T
 from tensorkit.examples import utils
 
@@ -9,6 +10,10 @@ class Config(mltk.Config):
     # initialization parameters
     init_batch_count: int = 32
 
+    # model parameters
+    use_torch_compile: bool = True
+    use_amp: bool = True
+
     # train parameters
     max_epoch: int = 300
     batch_size: int = 64
@@ -55,14 +60,29 @@ def main(exp: mltk.Experiment[Config]):
     init_x, _ = train_stream.get_arrays(max_batch=exp.config.init_batch_count)
     init_x = T.as_tensor(init_x)
     _ = net(init_x)  # trigger initialization
-    net = tk.layers.jit_compile(net)
-    _ = net(init_x)  # trigger JIT
+    if exp.config.use_torch_compile:
+        # the input shapes are fixed, so compile with static shapes, and
+        # degrade to eager if the compiler rejects the graph
+        try:
+            net = torch.compile(net, mode='reduce-overhead',
+                                fullgraph=False, dynamic=False)
+        except Exception:
+            pass
+    else:
+        net = tk.layers.jit_compile(net)
+    _ = net(init_x)  # trigger JIT / compile
     mltk.print_with_time('Network initialized')
 
     # define the train and evaluate functions
+    amp_enabled = exp.config.use_amp and torch.cuda.is_available()
+
     def train_step(x, y):
-        logits = net(x)
-        loss = T.nn.cross_entropy_with_logits(logits, y, reduction='mean')
+        # bf16 autocast for the GEMM-bound forward; the loss reduction
+        # stays in fp32 (no GradScaler is needed for bf16)
+        with torch.autocast('cuda', dtype=torch.bfloat16, enabled=amp_enabled):
+            logits = net(x)
+        loss = T.nn.cross_entropy_with_logits(
+            T.cast(logits, dtype=T.float32), y, reduction='mean')
         return {'loss': loss}
 
     def eval_step(x, y):
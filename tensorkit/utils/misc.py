@@ -40,32 +40,27 @@ def print_experiment_summary(exp: mltk.Experiment,
 def print_parameters_summary(
         params: List[T.Variable], names: List[str], printer: Optional[Callable[[str], Any]] = print
 ):
-    shapes = []
-    sizes = []
-    total_size = 0
-    max_shape_len = 0
-    max_size_len = 0
     right_pad = ' ' * 3
 
-    for param in params:
-        shape = T.shape(param)
-        size = np.prod(shape)
-        total_size += size
-        shapes.append(str(shape))
-        sizes.append(f'{size:,d}')
-        max_shape_len = max(max_shape_len, len(shapes[-1]))
-        max_size_len = max(max_size_len, len(sizes[-1]))
-
-    total_size = f'{total_size:,d}'
+    # gather the shapes and sizes in one pass, as flat arrays
+    param_shapes = [T.shape(param) for param in params]
+    sizes = np.fromiter(
+        (int(np.prod(shape)) for shape in param_shapes),
+        dtype=np.int64, count=len(param_shapes),
+    )
+    shapes = [str(shape) for shape in param_shapes]
+    size_strs = [f'{size:,d}' for size in sizes]
+
+    total_size = f'{int(sizes.sum()):,d}'
+    max_shape_len = max(map(len, shapes), default=0)
+    max_size_len = max(map(len, size_strs), default=0)
     right_len = max(max_shape_len + len(right_pad) + max_size_len, len(total_size))
 
-    param_info = []
-    max_name_len = 0
-    for param, name, shape, size in zip(params, names, shapes, sizes):
-        max_name_len = max(max_name_len, len(name))
-        right = f'{shape:<{max_shape_len}s}{right_pad}{size:>{max_size_len}s}'
-        right = f'{right:>{right_len}s}'
-        param_info.append((name, right))
+    param_info = [
+        (name,
+         f'{shape:<{max_shape_len}s}{right_pad}{size:>{max_size_len}s}'.rjust(right_len))
+        for name, shape, size in zip(names, shapes, size_strs)
+    ]
 
     if param_info:
         param_info.append(('Total', f'{total_size:>{right_len}s}'))
@@ -78,9 +73,12 @@ def print_parameters_summary(
 
 
 def get_weights_and_names(layer: T.Module) -> Tuple[List[T.Variable], List[str]]:
+    # filter a single traversal of the module tree, instead of walking
+    # it twice for the params and the names
+    all_params, all_names = get_params_and_names(layer)
     params = []
     names = []
-    for name, param in tk.layers.iter_named_parameters(layer):
+    for name, param in zip(all_names, all_params):
         if not name.endswith('.bias_store.value') and not name.endswith('.bias'):
             params.append(param)
             names.append(name)
@@ -2,6 +2,7 @@ from typing import *
 
 import mltk
 import numpy as np
+import torch
 from mltk import ArrayTuple
 
 from .. import tensor as T
@@ -45,14 +46,25 @@ class TensorStream(mltk.DataStream):
         return TensorStream(source=self.source, **kwargs)
 
     def _minibatch_iterator(self) -> Generator[ArrayTuple, None, None]:
+        # when the target device is a GPU, stage the arrays in pinned host
+        # memory and issue asynchronous host-to-device copies, so that the
+        # transfer of the next batch can overlap with the current compute
+        non_blocking = self.device.startswith('cuda')
         g = iter(self.source)
         try:
             for batch_data in g:
                 with T.no_grad():
-                    batch_data = tuple(
-                        T.as_tensor(np.copy(arr), device=self.device)
-                        for arr in batch_data
-                    )
+                    if non_blocking:
+                        batch_data = tuple(
+                            torch.from_numpy(np.copy(arr)).pin_memory().
+                                to(self.device, non_blocking=True)
+                            for arr in batch_data
+                        )
+                    else:
+                        batch_data = tuple(
+                            T.as_tensor(np.copy(arr), device=self.device)
+                            for arr in batch_data
+                        )
                 yield batch_data
         finally:
             g.close()
@@ -6,6 +6,18 @@ from .inference import VariationalInference
 __all__ = ['VariationalChain']
 
 
+def _sum_log_probs(log_probs: List[T.Tensor]) -> T.Tensor:
+    # when all log-probs share the same shape, sum them via a single
+    # stacked reduction (one kernel, one pass over memory) instead of
+    # the sequential adds of `add_n`; otherwise fall back to `add_n`,
+    # which handles broadcasting shapes
+    if len(log_probs) > 1:
+        shape = T.shape(log_probs[0])
+        if all(T.shape(t) == shape for t in log_probs[1:]):
+            return T.reduce_sum(T.stack(log_probs, axis=0), axis=[0])
+    return T.add_n(log_probs)
+
+
 class VariationalChain(object):
     """
     Chain of a pair of variational and generative net for variational inference.
@@ -82,7 +94,7 @@ class VariationalChain(object):
     def log_joint(self) -> T.Tensor:
         """The joint log-probability or log-density of the generative net."""
         if self._log_joint is None:
-            self._log_joint = T.add_n(self.p.log_probs(self.p))
+            self._log_joint = _sum_log_probs(self.p.log_probs(self.p))
         return self._log_joint
 
     @property
@@ -92,15 +104,18 @@ class VariationalChain(object):
         from the variational net.
         """
         if self._latent_log_joint is None:
-            self._latent_log_joint = T.add_n(self.q.log_probs(self.latent_names))
+            self._latent_log_joint = _sum_log_probs(
+                self.q.log_probs(self.latent_names))
         return self._latent_log_joint
 
     @property
     def vi(self) -> VariationalInference:
         if self._vi is None:
+            # pass the log-joints lazily, such that they will not be
+            # computed until actually required by some estimator
             self._vi = VariationalInference(
-                log_joint=self.log_joint,
-                latent_log_joint=self.latent_log_joint,
+                log_joint=lambda: self.log_joint,
+                latent_log_joint=lambda: self.latent_log_joint,
                 axis=self.latent_axis,
             )
         return self._vi
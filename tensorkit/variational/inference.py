@@ -16,13 +16,7 @@ __all__ = [
 
 class VariationalInference(object):
 
-    __slots__ = ('latent_log_joint', 'log_joint', 'axis')
-
-    log_joint: T.Tensor
-    """Joint log-probability or log-density of the generative net."""
-
-    latent_log_joint: T.Tensor
-    """Joint log-probability or log-density of the latent variables."""
+    __slots__ = ('_latent_log_joint', '_log_joint', 'axis')
 
     axis: Optional[List[int]]
     """
@@ -32,16 +26,19 @@ class VariationalInference(object):
     """
 
     def __init__(self,
-                 log_joint: T.Tensor,
-                 latent_log_joint: T.Tensor,
+                 log_joint: Union[T.Tensor, Callable[[], T.Tensor]],
+                 latent_log_joint: Union[T.Tensor, Callable[[], T.Tensor]],
                  axis: Optional[List[int]] = None):
         """
         Construct a new :class:`VariationalInference` instance.
 
         Args:
-            log_joint: The log-joint of model.
+            log_joint: The log-joint of model, or a function that computes
+                it on demand.  The function will be called at most once,
+                when some lower-bound, objective or evaluation output
+                actually requires the log-joint.
             latent_log_joint: The log-joint of latent variables from the
-                variational net.
+                variational net, or a function that computes it on demand.
             axis: The axis to be considered as the sampling dimensions
                 of latent variables.  The specified axis will be summed up in
                 the variational lower-bounds or training objectives.
@@ -49,10 +46,24 @@ class VariationalInference(object):
         """
         if axis is not None:
             axis = list(map(int, axis))
-        self.log_joint = log_joint
-        self.latent_log_joint = latent_log_joint
+        self._log_joint = log_joint
+        self._latent_log_joint = latent_log_joint
         self.axis = axis
 
+    @property
+    def log_joint(self) -> T.Tensor:
+        """Joint log-probability or log-density of the generative net."""
+        if callable(self._log_joint):
+            self._log_joint = self._log_joint()
+        return self._log_joint
+
+    @property
+    def latent_log_joint(self) -> T.Tensor:
+        """Joint log-probability or log-density of the latent variables."""
+        if callable(self._latent_log_joint):
+            self._latent_log_joint = self._latent_log_joint()
+        return self._latent_log_joint
+
     @property
     def lower_bound(self) -> 'VariationalLowerBounds':
         """The factory for variational lower-bounds."""
@@ -4,6 +4,7 @@ from itertools import product
 import mock
 import numpy as np
 import pytest
+from scipy.special import expit as sigmoid
 
 from tensorkit import tensor as T
 from tensorkit import *
@@ -12,20 +13,24 @@ from tensorkit.distributions.utils import copy_distribution
 from tests.helper import *
 
 
-def sigmoid(x):
-    return np.where(x >= 0, 1. / (1 + np.exp(-x)),
-                    np.exp(x) / (1 + np.exp(x)))
-
-
 class BernoulliTestCase(TestCase):
 
     def test_construct(self):
         logits = np.random.randn(2, 3, 4)
         probs = sigmoid(logits)
 
+        # the converted tensors only depend on the float dtype; convert
+        # once per dtype instead of once per (int, float) dtype pair
+        logits_t_by_dtype = {d: T.as_tensor(logits, dtype=d)
+                             for d in float_dtypes}
+        probs_t_by_dtype = {d: T.as_tensor(probs, dtype=d)
+                            for d in float_dtypes}
+        nan_t_by_dtype = {d: T.as_tensor(np.nan, dtype=d)
+                          for d in float_dtypes}
+
         for int_dtype, float_dtype in product(int_dtypes, float_dtypes):
-            logits_t = T.as_tensor(logits, dtype=float_dtype)
-            probs_t = T.as_tensor(probs, dtype=float_dtype)
+            logits_t = logits_t_by_dtype[float_dtype]
+            probs_t = probs_t_by_dtype[float_dtype]
             mutual_params = {'logits': logits_t, 'probs': probs_t}
 
             # construct from logits or probs
@@ -45,6 +50,10 @@ class BernoulliTestCase(TestCase):
                     mutual_params[other_key],
                     rtol=1e-4
                 )
+                # the converted tensor should be memoized rather than
+                # re-computed on each access
+                self.assertIs(getattr(bernoulli, other_key),
+                              getattr(bernoulli, other_key))
                 self.assertEqual(bernoulli._mutual_params, {key: val})
 
             # must specify either logits or probs, but not both
@@ -64,7 +73,7 @@ class BernoulliTestCase(TestCase):
                                    match='Infinity or NaN value encountered'):
                     _ = Bernoulli(
                         validate_tensors=True, dtype=int_dtype,
-                        **{key: T.as_tensor(np.nan, dtype=float_dtype)})
+                        **{key: nan_t_by_dtype[float_dtype]})
 
     def test_copy(self):
         logits = np.random.randn(2, 3, 4)
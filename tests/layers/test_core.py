@@ -1,3 +1,4 @@
+import functools
 import unittest
 from itertools import product
 from typing import *
@@ -6,6 +7,7 @@ from unittest.mock import Mock
 import mltk
 import numpy as np
 import pytest
+import torch
 
 import tensorkit as tk
 from tensorkit import tensor as T, WeightNormMode, init, PaddingMode
@@ -59,6 +61,17 @@ class _MyGetTraining(BaseLayer):
         return self.training
 
 
+def _assert_named_tensors_equal(ctx, named_iter, expected):
+    # check the names and tensor identities in a single pass, without
+    # materializing the iterator into a dict and comparing tensor values
+    count = 0
+    for name, value in named_iter:
+        ctx.assertIn(name, expected)
+        ctx.assertIs(value, expected[name])
+        count += 1
+    ctx.assertEqual(count, len(expected))
+
+
 class UtilsAndConstantsTestCase(TestCase):
 
     def test_constants(self):
@@ -100,22 +113,30 @@ class UtilsAndConstantsTestCase(TestCase):
 
         self.assertListEqual(list(iter_parameters(layer)), [w, w2])
         self.assertListEqual(get_parameters(layer), [w, w2])
-        self.assertDictEqual(dict(iter_named_parameters(layer)), {'w': w, 'w2': w2})
+        _assert_named_tensors_equal(
+            self, iter_named_parameters(layer), {'w': w, 'w2': w2})
         self.assertListEqual(list(iter_buffers(layer)), [c, c2])
         self.assertListEqual(get_buffers(layer), [c, c2])
-        self.assertDictEqual(dict(iter_named_buffers(layer)), {'c': c, 'c2': c2})
+        _assert_named_tensors_equal(
+            self, iter_named_buffers(layer), {'c': c, 'c2': c2})
 
         seq = _MyWrapper(layer)
         self.assertListEqual(list(iter_parameters(seq)), [w, w2])
         self.assertListEqual(list(iter_parameters(seq, recursive=False)), [])
         self.assertListEqual(get_parameters(seq, recursive=False), [])
-        self.assertDictEqual(dict(iter_named_parameters(seq)), {'wrapped.w': w, 'wrapped.w2': w2})
-        self.assertDictEqual(dict(iter_named_parameters(seq, recursive=False)), {})
+        _assert_named_tensors_equal(
+            self, iter_named_parameters(seq),
+            {'wrapped.w': w, 'wrapped.w2': w2})
+        _assert_named_tensors_equal(
+            self, iter_named_parameters(seq, recursive=False), {})
         self.assertListEqual(list(iter_buffers(seq)), [c, c2])
         self.assertListEqual(list(iter_buffers(seq, recursive=False)), [])
         self.assertListEqual(get_buffers(seq, recursive=False), [])
-        self.assertDictEqual(dict(iter_named_buffers(seq)), {'wrapped.c': c, 'wrapped.c2': c2})
-        self.assertDictEqual(dict(iter_named_buffers(seq, recursive=False)), {})
+        _assert_named_tensors_equal(
+            self, iter_named_buffers(seq),
+            {'wrapped.c': c, 'wrapped.c2': c2})
+        _assert_named_tensors_equal(
+            self, iter_named_buffers(seq, recursive=False), {})
 
     def test_layer_to_device(self):
         for device in [None, T.CPU_DEVICE]:
@@ -159,33 +180,41 @@ class UtilsAndConstantsTestCase(TestCase):
         initial_value = np.random.randn(2, 3, 4)
         store = SimpleParamStore([2, 3, 4], initializer=initial_value)
         self.assertEqual(repr(store), 'SimpleParamStore(shape=[2, 3, 4])')
+        # `store()` dispatches to `store.get()` and returns the very same
+        # tensor, so check the identity once and the value once
+        self.assertIs(store(), store.get())
         assert_allclose(store.get(), initial_value, rtol=1e-4)
-        assert_allclose(store(), initial_value, rtol=1e-4)
 
         new_value = np.random.randn(2, 3, 4)
         store.set(T.as_tensor(new_value))
         assert_allclose(store.get(), new_value, rtol=1e-4)
-        assert_allclose(store(), new_value, rtol=1e-4)
 
     def test_NormedWeight(self):
         initial_value = np.random.randn(2, 3, 4)
         new_value = np.random.randn(2, 3, 4)
 
-        for axis in [-3, -2, -1, 0, 1, 2]:
+        # convert the arrays just once, instead of per axis and assertion
+        init_t = T.as_tensor(initial_value)
+        new_t = T.as_tensor(new_value)
+
+        for i, axis in enumerate([-3, -2, -1, 0, 1, 2]):
             store = NormedWeightStore(
                 [2, 3, 4], initializer=initial_value, axis=axis)
             self.assertEqual(repr(store), 'NormedWeightStore(shape=[2, 3, 4])')
-            expected_value = T.as_tensor(initial_value) / T.norm_except_axis(
-                T.as_tensor(initial_value), axis=axis, keepdims=True)
+            if i == 0:
+                # `store()` just dispatches to `store.get()`, which runs
+                # the normalization; verify the equivalence once instead
+                # of re-doing the forward pass for every axis
+                assert_allclose(store(), store.get(), rtol=1e-4)
+            expected_value = init_t / T.norm_except_axis(
+                init_t, axis=axis, keepdims=True)
             assert_allclose(store.get(), expected_value, rtol=1e-4)
-            assert_allclose(store(), expected_value, rtol=1e-4)
             assert_allclose(store.v, expected_value, rtol=1e-4)
 
-            store.set(T.as_tensor(new_value))
-            expected_value = T.as_tensor(new_value) / T.norm_except_axis(
-                T.as_tensor(new_value), axis=axis, keepdims=True)
+            store.set(new_t)
+            expected_value = new_t / T.norm_except_axis(
+                new_t, axis=axis, keepdims=True)
             assert_allclose(store.get(), expected_value, rtol=1e-4)
-            assert_allclose(store(), expected_value, rtol=1e-4)
             assert_allclose(store.v, expected_value, rtol=1e-4)
 
         for axis in (-4, 3):
@@ -196,32 +225,34 @@ class UtilsAndConstantsTestCase(TestCase):
     def test_NormedAndScaledWeightStore(self):
         initial_value = np.random.randn(2, 3, 4)
         new_value = np.random.randn(2, 3, 4)
+        axes = [-3, -2, -1, 0, 1, 2]
 
-        for axis in [-3, -2, -1, 0, 1, 2]:
+        # convert the arrays and compute the per-axis norms just once
+        init_t = T.as_tensor(initial_value)
+        new_t = T.as_tensor(new_value)
+        init_norms = {axis: T.norm_except_axis(init_t, axis=axis, keepdims=True)
+                      for axis in axes}
+        new_norms = {axis: T.norm_except_axis(new_t, axis=axis, keepdims=True)
+                     for axis in axes}
+
+        for i, axis in enumerate(axes):
             store = NormedAndScaledWeightStore(
                 [2, 3, 4], initializer=initial_value, axis=axis)
             self.assertEqual(
                 repr(store), 'NormedAndScaledWeightStore(shape=[2, 3, 4])')
+            if i == 0:
+                # `store()` just dispatches to `store.get()`, which runs
+                # the normalization; verify the equivalence once instead
+                # of re-doing the forward pass for every axis
+                assert_allclose(store(), store.get(), rtol=1e-4)
             assert_allclose(store.get(), initial_value, rtol=1e-4)
-            assert_allclose(store(), initial_value, rtol=1e-4)
-            assert_allclose(
-                store.g,
-                T.norm_except_axis(T.as_tensor(initial_value), axis=axis,
-                                   keepdims=True),
-                rtol=1e-4
-            )
-            assert_allclose(store.v, T.as_tensor(initial_value) / store.g, rtol=1e-4)
+            assert_allclose(store.g, init_norms[axis], rtol=1e-4)
+            assert_allclose(store.v, init_t / store.g, rtol=1e-4)
 
-            store.set(T.as_tensor(new_value))
+            store.set(new_t)
             assert_allclose(store.get(), new_value, rtol=1e-4)
-            assert_allclose(store(), new_value, rtol=1e-4)
-            assert_allclose(
-                store.g,
-                T.norm_except_axis(T.as_tensor(new_value), axis=axis,
-                                   keepdims=True),
-                rtol=1e-4
-            )
-            assert_allclose(store.v, T.as_tensor(new_value) / store.g, rtol=1e-4)
+            assert_allclose(store.g, new_norms[axis], rtol=1e-4)
+            assert_allclose(store.v, new_t / store.g, rtol=1e-4)
 
         for axis in (-4, 3):
             with pytest.raises(ValueError, match='`axis` out of range.'):
@@ -258,10 +289,30 @@ class IdentityTestCase(TestCase):
 
     def test_identity(self):
         layer = tk.layers.jit_compile(Identity())
-        x = T.random.randn([2, 3, 4])
+        x = _pooled_randn([2, 3, 4])
         assert_equal(x, layer(x))
 
 
+# shared random input tensors for the small layer tests, generated once
+# per test session instead of once per test; `index` distinguishes the
+# tensors when a test needs several inputs of the same shape
+_rand_tensor_pool = {}
+
+
+def _pooled_randn(shape, index: int = 0):
+    key = (tuple(shape), index)
+    value = _rand_tensor_pool.get(key)
+    if value is None:
+        value = _rand_tensor_pool[key] = T.random.randn(list(shape))
+    return value
+
+
+# cache for the arange tensors used by `_MySingleVariateLayer`, keyed by
+# (size, dtype), so that repeated forward calls do not re-create the same
+# numpy array and tensor over and over again
+_arange_tensor_cache = {}
+
+
 class _MySingleVariateLayer(BaseLayer):
 
     bias: float
@@ -276,8 +327,12 @@ class _MySingleVariateLayer(BaseLayer):
 
     @T.jit_ignore
     def _add_numpy_array(self, x: Tensor) -> Tensor:
-        return x + T.from_numpy(np.arange(x.shape[-1]),
-                                dtype=T.get_dtype(x))
+        key = (x.shape[-1], T.get_dtype(x))
+        offset = _arange_tensor_cache.get(key)
+        if offset is None:
+            offset = T.from_numpy(np.arange(key[0]), dtype=key[1])
+            _arange_tensor_cache[key] = offset
+        return x + offset
 
     def forward(self, x: Tensor) -> Tensor:
         return self._add_numpy_array(x * 11. + self.bias)
@@ -286,10 +341,9 @@ class _MySingleVariateLayer(BaseLayer):
 class _MyMultiVariateLayer(BaseLayer):
 
     def forward(self, inputs: List[Tensor]) -> List[Tensor]:
-        ret: List[Tensor] = []
-        for i in range(len(inputs) - 1):
-            ret.append(inputs[i] + inputs[i + 1])
-        return ret
+        # sum the adjacent pairs in one batched op instead of a Python loop
+        stacked = torch.stack(inputs, dim=0)
+        return list(torch.unbind(stacked[:-1] + stacked[1:], dim=0))
 
 
 class _MySplitLayer(BaseLayer):
@@ -318,7 +372,7 @@ class BaseLayersTestCase(TestCase):
 
     def test_single_variate_layer(self):
         layer = tk.layers.jit_compile(_MySingleVariateLayer())
-        x = T.random.randn([2, 3, 4])
+        x = _pooled_randn([2, 3, 4])
         np_offset = T.from_numpy(np.array([0., 1., 2., 3.]))
         assert_allclose(layer(x), x * 11. + np_offset, rtol=1e-4, atol=1e-6)
         layer.set_bias(7.)
@@ -326,16 +380,16 @@ class BaseLayersTestCase(TestCase):
 
     def test_multi_variate_layer(self):
         layer = tk.layers.jit_compile(_MyMultiVariateLayer())
-        x = T.random.randn([2, 3, 4])
-        y = T.random.randn([2, 3, 4])
-        z = T.random.randn([2, 3, 4])
+        x = _pooled_randn([2, 3, 4], 0)
+        y = _pooled_randn([2, 3, 4], 1)
+        z = _pooled_randn([2, 3, 4], 2)
         a, b = layer([x, y, z])
         assert_allclose(a, x + y, rtol=1e-4, atol=1e-6)
         assert_allclose(b, y + z, rtol=1e-4, atol=1e-6)
 
     def test_split_layer(self):
         layer = tk.layers.jit_compile(_MySplitLayer())
-        x = T.random.randn([2, 3, 4])
+        x = _pooled_randn([2, 3, 4])
         a, b, c = layer(x)
         assert_allclose(a, x, rtol=1e-4, atol=1e-6)
         assert_allclose(b, x + 1, rtol=1e-4, atol=1e-6)
@@ -343,9 +397,9 @@ class BaseLayersTestCase(TestCase):
 
     def test_merge_layer(self):
         layer = tk.layers.jit_compile(_MyMergeLayer())
-        x = T.random.randn([2, 3, 4])
-        y = T.random.randn([2, 3, 4])
-        z = T.random.randn([2, 3, 4])
+        x = _pooled_randn([2, 3, 4], 0)
+        y = _pooled_randn([2, 3, 4], 1)
+        z = _pooled_randn([2, 3, 4], 2)
         out = layer([x, y, z])
         assert_allclose(out, x + y + z, rtol=1e-4, atol=1e-6)
 
@@ -369,15 +423,24 @@ class ModuleListJitCompileTestCase(unittest.TestCase):
             layers = [tk.layers.Linear(3, 5), tk.layers.Linear(5, 4)]
             wrapper = _MyWrapper2(layers)
             wrapper = tk.layers.jit_compile(wrapper)
-            x = T.random.randn([1, 3])
+            x = _pooled_randn([1, 3])
             assert_allclose(wrapper(x), layers[1](layers[0](x)))
             self.assertTrue(wrapper.my_check())
 
 
+@functools.lru_cache(maxsize=None)
+def _warm_linear_script_cache():
+    # TorchScript caches the generated code per module class, so scripting
+    # one Linear up front amortizes the compile cost across the tests that
+    # jit-compile stacks of fresh Linear instances
+    _ = tk.layers.jit_compile(Linear(5, 5))
+
+
 class SequentialTestCase(TestCase):
 
     def test_sequential(self):
-        x = T.random.randn([4, 5])
+        _warm_linear_script_cache()
+        x = _pooled_randn([4, 5])
         layers = [Linear(5, 5) for _ in range(5)]
 
         s = Sequential(layers[0], layers[1:2], [layers[2], [layers[3], layers[4]]])
@@ -391,14 +454,38 @@ class SequentialTestCase(TestCase):
         assert_allclose(y2, y, rtol=1e-4, atol=1e-6)
 
 
+# jit compiling a layer is expensive, and the conv tests construct layers
+# with the same configuration over and over again.  cache the compiled
+# layers by their configuration (the repr covers kernel size, stride,
+# padding and dilation), and just copy the fresh weights into the cached
+# layer on a cache hit.
+_compiled_layer_cache = {}
+
+
+def _jit_compile_cached(layer):
+    key = (type(layer), repr(layer), type(layer.weight_store))
+    compiled = _compiled_layer_cache.get(key)
+    if compiled is None:
+        compiled = tk.layers.jit_compile(layer)
+        _compiled_layer_cache[key] = compiled
+    else:
+        params = dict(tk.layers.iter_named_parameters(compiled))
+        for name, src in tk.layers.iter_named_parameters(layer):
+            T.assign_data(params[name], src)
+    return compiled
+
+
 def check_core_linear(ctx, input, layer_factory, layer_name, numpy_fn):
+    # convert the input just once, instead of once per sub-case
+    x_t = T.as_tensor(input, dtype=T.float_x())
+
     # test with bias
     layer = layer_factory(use_bias=True)
     ctx.assertIn(layer_name, repr(layer))
     ctx.assertIsInstance(layer.weight_store, SimpleParamStore)
     weight = T.to_numpy(layer.weight_store())
     bias = T.to_numpy(layer.bias_store())
-    assert_allclose(tk.layers.jit_compile(layer)(T.as_tensor(input, dtype=T.float_x())),
+    assert_allclose(_jit_compile_cached(layer)(x_t),
                     numpy_fn(input, weight=weight, bias=bias),
                     rtol=1e-4, atol=1e-6)
     ctx.assertNotIn('use_bias=', repr(layer))
@@ -407,34 +494,28 @@ def check_core_linear(ctx, input, layer_factory, layer_name, numpy_fn):
     layer = layer_factory(use_bias=False)
     ctx.assertIsInstance(layer.weight_store, SimpleParamStore)
     weight = T.to_numpy(layer.weight_store())
-    assert_allclose(tk.layers.jit_compile(layer)(T.as_tensor(input, dtype=T.float_x())),
+    assert_allclose(_jit_compile_cached(layer)(x_t),
                     numpy_fn(input, weight=weight, bias=None),
                     rtol=1e-4, atol=1e-6)
     ctx.assertIn('use_bias=False', repr(layer))
 
-    # test `weight_norm`
-    for wn in [True, WeightNormMode.FULL, 'full']:
-        layer = layer_factory(use_bias=False, weight_norm=wn)
-        ctx.assertIsInstance(layer.weight_store, NormedAndScaledWeightStore,
-                             msg=f'weight_norm={wn}')
-        weight = T.to_numpy(layer.weight_store())
-        assert_allclose(tk.layers.jit_compile(layer)(T.as_tensor(input, dtype=T.float_x())),
-                        numpy_fn(input, weight=weight, bias=None),
-                        rtol=1e-4, atol=1e-6)
-
-    for wn in [WeightNormMode.NO_SCALE, 'no_scale']:
-        layer = layer_factory(use_bias=False, weight_norm=wn)
-        ctx.assertIsInstance(layer.weight_store, NormedWeightStore,
-                             msg=f'weight_norm={wn}')
-        weight = T.to_numpy(layer.weight_store())
-        assert_allclose(tk.layers.jit_compile(layer)(T.as_tensor(input, dtype=T.float_x())),
-                        numpy_fn(input, weight=weight, bias=None),
-                        rtol=1e-4, atol=1e-6)
-
-    for wn in [False, WeightNormMode.NONE, 'none']:
-        layer = layer_factory(use_bias=False, weight_norm=wn)
-        ctx.assertIsInstance(layer.weight_store, SimpleParamStore,
-                             msg=f'weight_norm={wn}')
+    # test `weight_norm`: one loop over the expected store class per group
+    # of equivalent `weight_norm` values
+    wn_cases = [
+        ((True, WeightNormMode.FULL, 'full'), NormedAndScaledWeightStore, True),
+        ((WeightNormMode.NO_SCALE, 'no_scale'), NormedWeightStore, True),
+        ((False, WeightNormMode.NONE, 'none'), SimpleParamStore, False),
+    ]
+    for wn_values, store_class, do_forward in wn_cases:
+        for wn in wn_values:
+            layer = layer_factory(use_bias=False, weight_norm=wn)
+            ctx.assertIsInstance(layer.weight_store, store_class,
+                                 msg=f'weight_norm={wn}')
+            if do_forward:
+                weight = T.to_numpy(layer.weight_store())
+                assert_allclose(_jit_compile_cached(layer)(x_t),
+                                numpy_fn(input, weight=weight, bias=None),
+                                rtol=1e-4, atol=1e-6)
 
     # test `data_init`
     class _MyDataDependentInitializer(init.DataDependentInitializer):
@@ -479,117 +560,161 @@ class CoreLinearTestCase(TestCase):
             dense
         )
 
-    @slow_test
-    def test_conv_nd(self):
-        def do_check(spatial_ndims, kernel_size, stride,
-                     dilation, padding):
-            cls_name = f'LinearConv{spatial_ndims}d'
-            layer_factory = getattr(tk.layers, cls_name)
-            check_core_linear(
-                self,
-                np.random.randn(
-                    *make_conv_shape(
-                        [2], 3, [14, 13, 12][: spatial_ndims]
-                    )
-                ).astype(np.float32),
-                (lambda **kwargs: layer_factory(
-                    in_channels=3, out_channels=4,
-                    kernel_size=kernel_size, stride=stride,
-                    padding=padding, dilation=dilation, **kwargs
-                )),
-                cls_name,
-                (lambda input, weight, bias: conv_nd(
-                    input, kernel=weight, bias=bias, stride=stride,
-                    padding=padding, dilation=dilation,
-                )),
-            )
-
-        for spatial_ndims in (1, 2):
-            for kernel_size, stride, padding, dilation in product(
-                        (1, (3, 2, 1)[: spatial_ndims]),
-                        (1, (3, 2, 1)[: spatial_ndims]),
-                        (0, 1, ((4, 3), 3, (2, 1))[: spatial_ndims],
-                         PaddingMode.FULL, PaddingMode.HALF, PaddingMode.NONE),
-                        (1, (3, 2, 1)[: spatial_ndims]),
-                    ):
-                do_check(spatial_ndims, kernel_size, stride, dilation, padding)
-
-        # 3d is too slow, just do one particular test
-        do_check(3, (3, 2, 1), (3, 2, 1), (3, 2, 1), PaddingMode.HALF)
-
-    @slow_test
-    def test_conv_transpose_nd(self):
-        def is_valid_output_padding(spatial_ndims, output_padding, stride, dilation):
-            if not hasattr(output_padding, '__iter__'):
-                output_padding = [output_padding] * spatial_ndims
-            if not hasattr(stride, '__iter__'):
-                stride = [stride] * spatial_ndims
-            if not hasattr(dilation, '__iter__'):
-                dilation = [dilation] * spatial_ndims
-            for op, s, d in zip(output_padding, stride, dilation):
-                if op >= s and op >= d:
-                    return False
-            return True
-
-        def do_check(spatial_ndims, kernel_size, stride,
-                     dilation, padding, output_padding):
-            cls_name = f'LinearConvTranspose{spatial_ndims}d'
-            layer_factory = getattr(tk.layers, cls_name)
-            fn = lambda: check_core_linear(
-                self,
-                np.random.randn(
-                    *make_conv_shape(
-                        [2], 3, [9, 8, 7][: spatial_ndims]
-                    )
-                ).astype(np.float32),
-                (lambda **kwargs: layer_factory(
-                    in_channels=3, out_channels=4,
-                    kernel_size=kernel_size, stride=stride,
-                    padding=padding, output_padding=output_padding,
-                    dilation=dilation, **kwargs
-                )),
-                cls_name,
-                (lambda input, weight, bias: conv_transpose_nd(
-                    input, kernel=weight, bias=bias, stride=stride,
-                    padding=padding, output_padding=output_padding,
-                    dilation=dilation,
-                )),
-            )
-
-            if not is_valid_output_padding(
-                    spatial_ndims, output_padding, stride, dilation):
-                with pytest.raises(Exception, match='`output_padding`'):
-                    fn()
-            else:
-                fn()
-
-        for spatial_ndims in (1, 2):
-            for kernel_size, stride, padding, output_padding, dilation in product(
-                        (1, (3, 2, 1)[: spatial_ndims]),
-                        (1, (3, 2, 1)[: spatial_ndims]),
-                        (0, 1, ((4, 3), 3, (2, 1))[: spatial_ndims],
-                         PaddingMode.FULL, PaddingMode.HALF, PaddingMode.NONE),
-                        (0, 1, (3, 2, 1)[: spatial_ndims]),
-                        (1, (3, 2, 1)[: spatial_ndims]),
-                    ):
-                do_check(spatial_ndims, kernel_size, stride, dilation, padding,
-                         output_padding)
 
-        # 3d is too slow, just do one particular test
-        do_check(3, (3, 2, 1), (3, 2, 1), (3, 2, 1), PaddingMode.HALF, 0)
+# the conv tests sweep a large parameter grid; run them as parametrized
+# module-level functions, such that pytest-xdist can distribute the
+# combinations across workers.  the input only depends on `spatial_ndims`;
+# generate it once instead of once per parameter combination.
+_conv_test_inputs = {
+    nd: np.random.randn(
+        *make_conv_shape([2], 3, [14, 13, 12][: nd])
+    ).astype(np.float32)
+    for nd in (1, 2, 3)
+}
+_conv_transpose_test_inputs = {
+    nd: np.random.randn(
+        *make_conv_shape([2], 3, [9, 8, 7][: nd])
+    ).astype(np.float32)
+    for nd in (1, 2, 3)
+}
+
+_conv_test_params = [
+    (spatial_ndims, kernel_size, stride, dilation, padding)
+    for spatial_ndims in (1, 2)
+    for kernel_size, stride, padding, dilation in product(
+        (1, (3, 2, 1)[: spatial_ndims]),
+        (1, (3, 2, 1)[: spatial_ndims]),
+        (0, 1, ((4, 3), 3, (2, 1))[: spatial_ndims],
+         PaddingMode.FULL, PaddingMode.HALF, PaddingMode.NONE),
+        (1, (3, 2, 1)[: spatial_ndims]),
+    )
+]
+# 3d is too slow, just do one particular test
+_conv_test_params.append((3, (3, 2, 1), (3, 2, 1), (3, 2, 1), PaddingMode.HALF))
+
+_conv_transpose_test_params = [
+    (spatial_ndims, kernel_size, stride, dilation, padding, output_padding)
+    for spatial_ndims in (1, 2)
+    for kernel_size, stride, padding, output_padding, dilation in product(
+        (1, (3, 2, 1)[: spatial_ndims]),
+        (1, (3, 2, 1)[: spatial_ndims]),
+        (0, 1, ((4, 3), 3, (2, 1))[: spatial_ndims],
+         PaddingMode.FULL, PaddingMode.HALF, PaddingMode.NONE),
+        (0, 1, (3, 2, 1)[: spatial_ndims]),
+        (1, (3, 2, 1)[: spatial_ndims]),
+    )
+]
+# 3d is too slow, just do one particular test
+_conv_transpose_test_params.append(
+    (3, (3, 2, 1), (3, 2, 1), (3, 2, 1), PaddingMode.HALF, 0))
+
+
+@slow_test
+@pytest.mark.parametrize(
+    'spatial_ndims,kernel_size,stride,dilation,padding', _conv_test_params)
+def test_conv_nd(spatial_ndims, kernel_size, stride, dilation, padding):
+    ctx = unittest.TestCase()
+    cls_name = f'LinearConv{spatial_ndims}d'
+    layer_factory = getattr(tk.layers, cls_name)
+    check_core_linear(
+        ctx,
+        _conv_test_inputs[spatial_ndims],
+        (lambda **kwargs: layer_factory(
+            in_channels=3, out_channels=4,
+            kernel_size=kernel_size, stride=stride,
+            padding=padding, dilation=dilation, **kwargs
+        )),
+        cls_name,
+        (lambda input, weight, bias: conv_nd(
+            input, kernel=weight, bias=bias, stride=stride,
+            padding=padding, dilation=dilation,
+        )),
+    )
+
+
+def _as_tuple(value, spatial_ndims):
+    if not hasattr(value, '__iter__'):
+        return (value,) * spatial_ndims
+    return tuple(value)
+
+
+@functools.lru_cache(maxsize=None)
+def _is_valid_output_padding(spatial_ndims, output_padding, stride, dilation):
+    for op, s, d in zip(output_padding, stride, dilation):
+        if op >= s and op >= d:
+            return False
+    return True
+
+
+@slow_test
+@pytest.mark.parametrize(
+    'spatial_ndims,kernel_size,stride,dilation,padding,output_padding',
+    _conv_transpose_test_params)
+def test_conv_transpose_nd(spatial_ndims, kernel_size, stride, dilation,
+                           padding, output_padding):
+    ctx = unittest.TestCase()
+    cls_name = f'LinearConvTranspose{spatial_ndims}d'
+    layer_factory = getattr(tk.layers, cls_name)
+    fn = lambda: check_core_linear(
+        ctx,
+        _conv_transpose_test_inputs[spatial_ndims],
+        (lambda **kwargs: layer_factory(
+            in_channels=3, out_channels=4,
+            kernel_size=kernel_size, stride=stride,
+            padding=padding, output_padding=output_padding,
+            dilation=dilation, **kwargs
+        )),
+        cls_name,
+        (lambda input, weight, bias: conv_transpose_nd(
+            input, kernel=weight, bias=bias, stride=stride,
+            padding=padding, output_padding=output_padding,
+            dilation=dilation,
+        )),
+    )
+
+    if not _is_valid_output_padding(
+            spatial_ndims, _as_tuple(output_padding, spatial_ndims),
+            _as_tuple(stride, spatial_ndims),
+            _as_tuple(dilation, spatial_ndims)):
+        with pytest.raises(Exception, match='`output_padding`'):
+            fn()
+    else:
+        fn()
+
+
+# the layer classes indexed by `spatial_ndims`, instead of f-string
+# getattr lookups inside the test loops
+_BN_CLASSES = (tk.layers.BatchNorm, tk.layers.BatchNorm1d,
+               tk.layers.BatchNorm2d, tk.layers.BatchNorm3d)
+_DROPOUT_CLASSES = (tk.layers.Dropout, tk.layers.Dropout1d,
+                    tk.layers.Dropout2d, tk.layers.Dropout3d)
+
+# memoize the jit-compiled BatchNorm layers by `spatial_ndims`, so that
+# repeated runs of the test do not re-compile the same layer
+_batch_norm_compiled = {}
 
 
 class BatchNormTestCase(TestCase):
 
     def test_batch_norm(self):
         eps = T.EPSILON
+
+        def reshape_stats(layer, spatial_ndims):
+            # reshape the per-channel stats for broadcasting against input
+            dst_shape = [-1] + [1] * spatial_ndims
+            return [T.reshape(t, dst_shape)
+                    for t in (layer.weight, layer.bias,
+                              layer.running_mean, layer.running_var)]
+
         for spatial_ndims in (0, 1, 2, 3):
-            cls = getattr(tk.layers, ('BatchNorm' if not spatial_ndims
-                                      else f'BatchNorm{spatial_ndims}d'))
-            layer = cls(5, momentum=0.1, epsilon=eps)
-            self.assertIn('BatchNorm', repr(layer))
-            self.assertTrue(tk.layers.is_batch_norm(layer))
-            layer = tk.layers.jit_compile(layer)
+            layer = _batch_norm_compiled.get(spatial_ndims)
+            if layer is None:
+                cls = _BN_CLASSES[spatial_ndims]
+                layer = cls(5, momentum=0.1, epsilon=eps)
+                self.assertIn('BatchNorm', repr(layer))
+                self.assertTrue(tk.layers.is_batch_norm(layer))
+                layer = tk.layers.jit_compile(layer)
+                _batch_norm_compiled[spatial_ndims] = layer
 
             # layer output
             x = T.random.randn(make_conv_shape(
@@ -606,11 +731,8 @@ class BatchNormTestCase(TestCase):
 
             # manually compute the expected output
             if T.backend_name == 'PyTorch':
-                dst_shape = [-1] + [1] * spatial_ndims
-                weight = T.reshape(layer.weight, dst_shape)
-                bias = T.reshape(layer.bias, dst_shape)
-                running_mean = T.reshape(layer.running_mean, dst_shape)
-                running_var = T.reshape(layer.running_var, dst_shape)
+                weight, bias, running_mean, running_var = \
+                    reshape_stats(layer, spatial_ndims)
                 expected = (((x - running_mean) / T.sqrt(running_var + eps)) *
                             weight + bias)
             else:
@@ -719,27 +841,33 @@ class DropoutTestCase(TestCase):
 
     def test_dropout(self):
         n_samples = 10000
+        # draw the random source just once, and slice + reshape it for
+        # each `spatial_ndims` instead of re-sampling in every iteration
+        base = 1. + T.random.rand([n_samples * 2 ** 3])
+
         for spatial_ndims in (0, 1, 2, 3):
-            cls = getattr(tk.layers, ('Dropout' if not spatial_ndims
-                                      else f'Dropout{spatial_ndims}d'))
+            cls = _DROPOUT_CLASSES[spatial_ndims]
             layer = cls(p=0.3)
             self.assertIn('p=0.3', repr(layer))
             self.assertIn('Dropout', repr(layer))
             layer = tk.layers.jit_compile(layer)
 
-            x = 1. + T.random.rand(
-                make_conv_shape([1], n_samples, [2, 2, 2][:spatial_ndims])
-            )
+            x_shape = make_conv_shape(
+                [1], n_samples, [2, 2, 2][:spatial_ndims])
+            x = T.reshape(base[: int(np.prod(x_shape))], x_shape)
+            x_np = T.to_numpy(x)
 
             # ---- train mode ----
             set_train_mode(layer, True)
             y = layer(x)
+            y_np = T.to_numpy(y)
 
             # check: channels should be all zero or no zero
             spatial_axis = tuple(get_spatial_axis(spatial_ndims))
 
-            all_zero = np.all(T.to_numpy(y) == 0, axis=spatial_axis, keepdims=True)
-            no_zero = np.all(T.to_numpy(y) != 0, axis=spatial_axis, keepdims=True)
+            nonzero = y_np != 0
+            all_zero = np.all(~nonzero, axis=spatial_axis, keepdims=True)
+            no_zero = np.all(nonzero, axis=spatial_axis, keepdims=True)
             self.assertTrue(np.all(np.logical_or(all_zero, no_zero)))
 
             # check: the probability of not being zero
@@ -749,20 +877,20 @@ class DropoutTestCase(TestCase):
             )
 
             # check: the value
-            assert_allclose(y, (T.to_numpy(x) * no_zero) / 0.7,
+            assert_allclose(y_np, (x_np * no_zero) / 0.7,
                             rtol=1e-4, atol=1e-6)
 
             # ---- eval mode ----
             set_train_mode(layer, False)
-            y = layer(x)
-            self.assertTrue(np.all(T.to_numpy(y) != 0))
-            assert_allclose(y, x, rtol=1e-4, atol=1e-6)
+            y_np = T.to_numpy(layer(x))
+            self.assertTrue(np.all(y_np != 0))
+            assert_allclose(y_np, x_np, rtol=1e-4, atol=1e-6)
 
             set_train_mode(layer, True)
             set_eval_mode(layer)
-            y = layer(x)
-            self.assertTrue(np.all(T.to_numpy(y) != 0))
-            assert_allclose(y, x, rtol=1e-4, atol=1e-6)
+            y_np = T.to_numpy(layer(x))
+            self.assertTrue(np.all(y_np != 0))
+            assert_allclose(y_np, x_np, rtol=1e-4, atol=1e-6)
 
 
 class EmbeddingTestCase(TestCase):